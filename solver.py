@@ -12,20 +12,39 @@ This solver handles:
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Final
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from ortools.sat.python import cp_model
+import numpy as np
 import uvicorn
+import asyncio
+import multiprocessing
+import queue
 import time
 import gc
+import json
+import os
 import threading
 import uuid
 from datetime import datetime
 
 app = FastAPI(title="Timetable Solver API", version="1.0.0")
 
-# Global job storage for asynchronous processing
+# Global job storage for asynchronous processing (guarded by jobs_lock)
 active_jobs: Dict[str, Dict] = {}
+jobs_lock = threading.Lock()
+
+# Bounded pool driving solves (/start-solve jobs and /solve): each solve runs in its
+# own child process, so extra solves wait in the queue ('starting' for jobs)
+JOB_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2))
+JOB_RETENTION_SECONDS = 3600  # Finished jobs are dropped this long after completion
+JOB_EVENTS_POLL_SECONDS = 1.0  # How often /job-events checks its job for changes
+JOB_EVENTS_KEEPALIVE_SECONDS = 15.0  # Comment line sent on idle streams so proxies keep them open
+# Solve processes get maxTimeLimit plus this long (extraction, response build) before being killed
+SOLVE_GRACE_SECONDS = 60
 
 # CORS middleware for Next.js integration (Universal for debugging)
 app.add_middleware(
@@ -61,7 +80,7 @@ class Lesson(BaseModel):
     classIds: List[str]
     numberOfSingles: int
     numberOfDoubles: int
-    color: Optional[str] = "#3B82F6"
+    color: Optional[str] = "#3B82F6"  # Display only - not used by the solver
 
 class Class(BaseModel):
     model_config = {"populate_by_name": True}
@@ -76,10 +95,12 @@ class SolverRequest(BaseModel):
     lessons: List[Lesson]
     classes: List[Class]
     config: SchoolConfig = Field(alias='schoolConfig')  # Map frontend 'schoolConfig' to 'config'
-    allowRelaxation: bool = True  # Allow two-stage solving with relaxed penalties
+    allowRelaxation: bool = True  # Accepted for compatibility; distribution is always HARD
     maxTimeLimit: int = 180  # User-defined time limit in seconds
 
 class TimetableSlot(BaseModel):
+    model_config = {"frozen": True, "extra": "forbid"}
+    
     classId: str
     lessonId: str
     day: str
@@ -111,17 +132,76 @@ class SolverResponse(BaseModel):
 
 # ==================== CP-SAT SOLVER ====================
 
+# Status names resolved once (solver.StatusName is a C++ call per lookup)
+_STATUS_NAME = {
+    cp_model.OPTIMAL: "OPTIMAL",
+    cp_model.FEASIBLE: "FEASIBLE",
+    cp_model.INFEASIBLE: "INFEASIBLE",
+    cp_model.UNKNOWN: "UNKNOWN",
+    cp_model.MODEL_INVALID: "MODEL_INVALID",
+}
+
+# Response message templates (filled in by _build_response)
+_OPTIMAL_MSG_FMT: Final[str] = "✅ Optimal solution! Placed {placed}/{total} periods ({pct:.1f}%)"
+_FEASIBLE_MSG_FMT: Final[str] = "✅ Feasible solution. Placed {placed}/{total} periods ({pct:.1f}%)"
+_FAILED_MSG_FMT: Final[str] = "❌ No solution found (status: {status})"
+_SUCCESS_MSG_FMT: Final[Dict[int, str]] = {
+    cp_model.OPTIMAL: _OPTIMAL_MSG_FMT,
+    cp_model.FEASIBLE: _FEASIBLE_MSG_FMT,
+}
+
+class StagnationCallback(cp_model.CpSolverSolutionCallback):
+    """Tracks when the incumbent last improved so the search can stop on stagnation
+    
+    CP-SAT only reports strictly improving solutions, and every objective term
+    is a multiple of 1,000,000 (one placed period), so each callback places at
+    least one more period. `stalled()` reports no improvement for
+    `stall_seconds` once `min_seconds` have elapsed and a solution exists
+    (the search keeps going until the deadline while it has none).
+    """
+    def __init__(self, stall_seconds: float = 120.0, min_seconds: float = 300.0):
+        super().__init__()
+        self.stall_seconds = stall_seconds
+        self.min_seconds = min_seconds
+        self.started = time.time()
+        self.last_improvement = None
+    
+    def on_solution_callback(self):
+        self.last_improvement = time.time()
+    
+    def stalled(self) -> bool:
+        if self.last_improvement is None:
+            return False
+        now = time.time()
+        return now - self.started > self.min_seconds and now - self.last_improvement > self.stall_seconds
+
 class TimetableSolver:
-    def __init__(self, request: SolverRequest):
+    # Max distinct (lesson, task type) pairs probed for an UNSAT core per response
+    CORE_DIAGNOSTIC_LIMIT = 25
+    # Name model variables (for log/model export debugging); unnamed is cheaper to build
+    DEBUG_VAR_NAMES = False
+    # Stream CP-SAT search logs to stdout; logging slows the search down
+    DEBUG_SEARCH_LOG = False
+    # Models this small solve fastest (and deterministically) on a single worker
+    SMALL_MODEL_VAR_LIMIT = 500
+    
+    def __init__(self, request: SolverRequest, freeze_gc: bool = False):
         self.request = request
+        # Freeze the built model out of the GC's reach; only safe in a process running one solve
+        self._freeze_gc = freeze_gc
         self.model = cp_model.CpModel()
         self.solver = cp_model.CpSolver()
+        self._num_workers = min(16, max(4, os.cpu_count() or 4))  # One worker per core; CP-SAT portfolio tops out at 16
         
         # Extract data
         self.lessons = request.lessons
         self.classes = request.classes
         self.config = request.config
         
+        # O(1) lookups by ID (used in extraction and diagnostics)
+        self._lesson_by_id = {l.lesson_id: l for l in self.lessons}
+        self._class_name_by_id = {c.class_id: f"{c.grade}-{c.name}" for c in self.request.classes}
+        
         # Calculate valid double period starts (cannot span intervals)
         self.valid_double_starts = self._calculate_valid_double_starts()
         
@@ -130,14 +210,45 @@ class TimetableSolver:
         self.num_days = len(self.days)
         self.num_periods = self.config.numberOfPeriods
         
+        # Dense indices: (day, period) -> day_idx * num_periods + period - 1,
+        # teachers/classes -> rows of the diagnostic busy matrices
+        self._day_index = {day: i for i, day in enumerate(self.days)}
+        self._teacher_idx = {
+            teacher_id: i
+            for i, teacher_id in enumerate(dict.fromkeys(t for l in self.lessons for t in l.teacherIds))
+        }
+        self._class_idx = {
+            class_id: i
+            for i, class_id in enumerate(dict.fromkeys(
+                [c.class_id for c in self.classes] + [c for l in self.lessons for c in l.classIds]
+            ))
+        }
+        
         # CRITICAL: Validate period boundaries
         print(f"🔢 CRITICAL: Solver initialized with {self.num_periods} periods per day")
         print(f"   📊 Total capacity: {len(self.classes)} classes × {self.num_periods} periods × {self.num_days} days = {len(self.classes) * self.num_periods * self.num_days} slots")
         
         # Decision variables
-        self.task_vars = {}  # (lesson_idx, class_idx, period_type, day, period) -> BoolVar
-        self.presence_vars = {}  # task_idx -> BoolVar (whether task is placed)
+        self._task_to_vars = defaultdict(list)  # task_idx -> [(day, period, BoolVar, is_double)]
+        self.task_day_vars = []  # task_idx -> day_idx -> [BoolVar] (candidate slots that day)
+        # Proto indices of every slot var in _task_to_vars order, and each task's first position
+        self._candidate_index = np.zeros(0, dtype=np.int64)
+        self._candidate_offsets = np.zeros(0, dtype=np.int64)
+        self.task_presence = {}  # task_idx -> BoolVar (task placed), channeled to its slot vars
+        self.task_intervals = {}  # task_idx -> optional IntervalVar over flattened (day, period) slots
+        self.teacher_intervals = defaultdict(list)  # teacher_id -> [IntervalVar] of the teacher's tasks
+        self.class_intervals = defaultdict(list)  # class_id -> [IntervalVar] of the class's tasks
+        self.class_to_tasks = defaultdict(list)  # class_id -> [task_info entry] (inverted index)
+        self.class_subject_tasks = defaultdict(list)  # (class_id, first subject_id) -> [task_idx]
         self.task_info = []  # Metadata for each task
+        self._total_required_slots = 0  # Periods to fill (set by _create_variables)
+        self._slot_weights = np.zeros(0, dtype=np.int32)  # task_idx -> periods filled across classes
+        self._last_assignment = {}  # task_idx -> (day, period) from the last extraction
+        self._deadline = float('inf')  # Wall-clock end of the current solve's budget (set by solve)
+        
+        # Teacher/class busy matrices (entity_idx x slot_idx), kept in step with _last_assignment
+        self._teacher_busy = np.zeros((len(self._teacher_idx), self.num_days * self.num_periods), dtype=np.uint8)
+        self._class_busy = np.zeros((len(self._class_idx), self.num_days * self.num_periods), dtype=np.uint8)
         
         # Statistics
         self.stats = {
@@ -165,75 +276,120 @@ class TimetableSolver:
     
     def _create_variables(self):
         """Create decision variables for all possible task placements"""
-        # CRITICAL: Clear all previous data to prevent duplication during model rebuilds
-        self.task_vars = {}
+        # Reset all per-model state (the model is built once per solve)
+        self._task_to_vars = defaultdict(list)
         self.task_info = []
-        self.presence_vars = {}
+        self.task_presence = {}
+        self.task_intervals = {}
+        self.teacher_intervals = defaultdict(list)
+        self.class_intervals = defaultdict(list)
+        self.class_to_tasks = defaultdict(list)
+        self.class_subject_tasks = defaultdict(list)
         self.stats['singlesCreated'] = 0
         self.stats['doublesCreated'] = 0
         
         print(f"📊 Creating variables for {len(self.lessons)} lessons...")
         print("   🔄 PARALLEL MODE: One task per lesson (applies to ALL classes)")
         
+        # Single pass: variables, task_info, per-day candidate lists, slot weights and
+        # (via _create_task_interval) the teacher/class/subject indices
+        self.task_day_vars = []
+        candidate_index = []
+        candidate_offsets = []
+        period_lengths = []
+        class_counts = []
         task_idx = 0
         for lesson_idx, lesson in enumerate(self.lessons):
             # ✨ CRITICAL CHANGE: Create ONE task per lesson (not per class)
             # This ensures parallel classes get scheduled at the SAME time
+            tasks = [('single', num, range(1, self.num_periods + 1)) for num in range(lesson.numberOfSingles)]
+            tasks += [('double', num, self.valid_double_starts) for num in range(lesson.numberOfDoubles)]
+            class_names = [self._class_name_by_id.get(c, "Unknown") for c in lesson.classIds]
             
-            # Single period tasks
-            for single_num in range(lesson.numberOfSingles):
-                for day in self.days:
-                    for period in range(1, self.num_periods + 1):
-                        var = self.model.NewBoolVar(
-                            f"lesson_{lesson_idx}_single_{single_num}_day_{day}_period_{period}"
-                        )
-                        self.task_vars[(lesson_idx, 'single', task_idx, day, period)] = var
-                        
-                        if day == self.days[0] and period == 1:
-                            self.task_info.append({
-                                'task_idx': task_idx,
-                                'lesson_idx': lesson_idx,
-                                'lesson': lesson,
-                                'classIds': lesson.classIds,  # Store ALL classIds
-                                'type': 'single'
-                            })
-                            self.stats['singlesCreated'] += 1
-                task_idx += 1
-            
-            # Double period tasks
-            for double_num in range(lesson.numberOfDoubles):
+            for task_type, task_num, starts in tasks:
+                is_double = task_type == 'double'
+                self.task_info.append({
+                    'task_idx': task_idx,
+                    'lesson_idx': lesson_idx,
+                    'lesson': lesson,
+                    'classIds': lesson.classIds,  # Store ALL classIds
+                    'class_names': class_names,
+                    'type': task_type
+                })
+                self.stats['doublesCreated' if is_double else 'singlesCreated'] += 1
+                
+                candidate_offsets.append(len(candidate_index))
+                day_vars = []
                 for day in self.days:
-                    for period in self.valid_double_starts:
+                    vars_today = []
+                    for period in starts:
                         var = self.model.NewBoolVar(
-                            f"lesson_{lesson_idx}_double_{double_num}_day_{day}_period_{period}"
+                            f"lesson_{lesson_idx}_{task_type}_{task_num}_day_{day}_period_{period}"
+                            if self.DEBUG_VAR_NAMES else ""
                         )
-                        self.task_vars[(lesson_idx, 'double', task_idx, day, period)] = var
-                        
-                        if day == self.days[0] and period == self.valid_double_starts[0]:
-                            self.task_info.append({
-                                'task_idx': task_idx,
-                                'lesson_idx': lesson_idx,
-                                'lesson': lesson,
-                                'classIds': lesson.classIds,  # Store ALL classIds
-                                'type': 'double'
-                            })
-                            self.stats['doublesCreated'] += 1
+                        self._task_to_vars[task_idx].append((day, period, var, is_double))
+                        candidate_index.append(var.Index())
+                        vars_today.append(var)
+                    day_vars.append(vars_today)
+                self.task_day_vars.append(day_vars)
+                
+                period_lengths.append(2 if is_double else 1)
+                class_counts.append(len(lesson.classIds))
+                self._create_task_interval(task_idx, lesson, 2 if is_double else 1)
                 task_idx += 1
         
         self.stats['totalTasks'] = len(self.task_info)
+        self._candidate_index = np.array(candidate_index, dtype=np.int64)
+        self._candidate_offsets = np.array(candidate_offsets, dtype=np.int64)
         
         # Calculate TRUE total period slots (914 expected)
         # Formula: sum of (periods per task * number of classes)
         # Single lessons = 1 period per class, Double lessons = 2 periods per class
-        total_period_slots = sum(
-            (1 if t['type'] == 'single' else 2) * len(t['classIds']) 
-            for t in self.task_info
-        )
+        # _slot_weights[task_idx] = periods the task fills across all its classes
+        class_counts = np.array(class_counts, dtype=np.int32)
+        self._slot_weights = np.array(period_lengths, dtype=np.int32) * class_counts
+        total_period_slots = int(self._slot_weights.sum())
+        self._total_required_slots = total_period_slots  # Fixed for the life of the model
         
         print(f"✅ Created {self.stats['totalTasks']} unified tasks ({self.stats['singlesCreated']} singles, {self.stats['doublesCreated']} doubles)")
         print(f"   📍 Total period slots to fill: {total_period_slots} (TRUE count: each task × classes × periods)")
-        print(f"   🎯 Breakdown: {sum(len(t['classIds']) for t in self.task_info)} class instances across all tasks")
+        print(f"   🎯 Breakdown: {int(class_counts.sum())} class instances across all tasks")
         print(f"   🎯 Goal: Place all {total_period_slots} slots for 100% success")
+        
+        if self._freeze_gc:
+            # The CP-SAT wrappers and candidate tuples live until the process exits
+            gc.collect()
+            gc.freeze()
+    
+    def _create_task_interval(self, task_idx: int, lesson: Lesson, size: int):
+        """Optional interval for a task over the flattened day * num_periods + period - 1 timeline
+        
+        The start is channeled to the task's slot vars, so doubles (size 2) never
+        cross a day or an interval break: only valid_double_starts are candidates.
+        """
+        candidates = self._task_to_vars[task_idx]
+        name = f"task_{task_idx}" if self.DEBUG_VAR_NAMES else ""
+        presence = self.model.NewBoolVar(f"{name}_present" if name else "")
+        offsets = [self._day_index[day] * self.num_periods + period - 1 for day, period, _, _ in candidates]
+        # Start ranges over the candidate offsets only; 0 is what the channel yields when absent
+        start = self.model.NewIntVarFromDomain(
+            cp_model.Domain.FromValues(sorted(set(offsets) | {0})), f"{name}_start" if name else ""
+        )
+        self.model.Add(start == cp_model.LinearExpr.WeightedSum([var for _, _, var, _ in candidates], offsets))
+        self.task_presence[task_idx] = presence
+        interval = self.model.NewOptionalFixedSizeIntervalVar(start, size, presence, f"{name}_interval" if name else "")
+        self.task_intervals[task_idx] = interval
+        
+        # Register the task on every teacher and class resource it uses, and under its
+        # first subject for distribution (lessons can have multiple subjects)
+        subject_id = lesson.subjectIds[0] if lesson.subjectIds else None
+        for teacher_id in lesson.teacherIds:
+            self.teacher_intervals[teacher_id].append(interval)
+        for class_id in lesson.classIds:
+            self.class_intervals[class_id].append(interval)
+            self.class_to_tasks[class_id].append(self.task_info[task_idx])
+            if subject_id:
+                self.class_subject_tasks[(class_id, subject_id)].append(task_idx)
     
     def _add_constraints(self):
         """Add all hard constraints to the model"""
@@ -248,247 +404,199 @@ class TimetableSolver:
         # 3. No class overlap (same class cannot have multiple lessons)
         self._add_class_no_overlap_constraints()
         
-        # 4. Double periods must occupy both periods
-        self._add_double_period_constraints()
-        
         print(f"✅ Added {self.stats['constraintsAdded']} constraints")
     
     def _add_task_assignment_constraints(self):
         """Each task CAN be assigned to at most one time slot (soft constraint)"""
-        for task in self.task_info:
-            task_idx = task['task_idx']
-            lesson_idx = task['lesson_idx']
-            task_type = task['type']
-            
-            # Create presence variable for this task
-            presence_var = self.model.NewBoolVar(f"presence_task_{task_idx}")
-            self.presence_vars[task_idx] = presence_var
+        for task_idx, candidates in self._task_to_vars.items():
+            # Collect all slot variables for this task
+            task_slot_vars = [var for _, _, var, _ in candidates]
             
-            # Sum all variables for this task
-            task_slot_vars = []
-            for day in self.days:
-                if task_type == 'single':
-                    for period in range(1, self.num_periods + 1):
-                        key = (lesson_idx, 'single', task_idx, day, period)
-                        if key in self.task_vars:
-                            task_slot_vars.append(self.task_vars[key])
-                else:  # double
-                    for period in self.valid_double_starts:
-                        key = (lesson_idx, 'double', task_idx, day, period)
-                        if key in self.task_vars:
-                            task_slot_vars.append(self.task_vars[key])
-            
-            # Task is placed if and only if exactly one slot is assigned
-            # sum(task_slot_vars) == presence_var
-            self.model.Add(sum(task_slot_vars) == presence_var)
+            # Task is placed in at most one slot, and in exactly one when present
+            self.model.AddExactlyOne(task_slot_vars + [self.task_presence[task_idx].Not()])
             self.stats['constraintsAdded'] += 1
     
     def _add_teacher_no_overlap_constraints(self):
         """No teacher can be in two places at the same time"""
-        # Group lessons by teacher
-        teacher_lessons = {}
-        for lesson_idx, lesson in enumerate(self.lessons):
-            for teacher_id in lesson.teacherIds:
-                if teacher_id not in teacher_lessons:
-                    teacher_lessons[teacher_id] = []
-                teacher_lessons[teacher_id].append(lesson_idx)
-        
-        # For each teacher, for each day/period, ensure at most 1 lesson
-        for teacher_id, lesson_indices in teacher_lessons.items():
-            if len(lesson_indices) < 2:
+        # One disjunctive resource per teacher over the tasks' intervals
+        for teacher_id, intervals in self.teacher_intervals.items():
+            if len(intervals) < 2:
                 continue  # No conflict possible
-            
-            for day in self.days:
-                for period in range(1, self.num_periods + 1):
-                    # Collect all variables for this teacher at this time
-                    teacher_period_vars = []
-                    
-                    for lesson_idx in lesson_indices:
-                        # Find all tasks for this lesson
-                        for task in self.task_info:
-                            if task['lesson_idx'] == lesson_idx:
-                                task_idx = task['task_idx']
-                                task_type = task['type']
-                                
-                                if task_type == 'single':
-                                    # Check singles at this period
-                                    key = (lesson_idx, 'single', task_idx, day, period)
-                                    if key in self.task_vars:
-                                        teacher_period_vars.append(self.task_vars[key])
-                                else:  # double
-                                    # Check doubles that occupy this period
-                                    # Double at period P occupies P and P+1
-                                    if period - 1 in self.valid_double_starts:
-                                        key = (lesson_idx, 'double', task_idx, day, period - 1)
-                                        if key in self.task_vars:
-                                            teacher_period_vars.append(self.task_vars[key])
-                                    if period in self.valid_double_starts:
-                                        key = (lesson_idx, 'double', task_idx, day, period)
-                                        if key in self.task_vars:
-                                            teacher_period_vars.append(self.task_vars[key])
-                    
-                    if len(teacher_period_vars) > 1:
-                        self.model.Add(sum(teacher_period_vars) <= 1)
-                        self.stats['constraintsAdded'] += 1
+            self.model.AddNoOverlap(intervals)
+            self.stats['constraintsAdded'] += 1
     
     def _add_class_no_overlap_constraints(self):
         """No class can have two lessons at the same time"""
         print("   🎯 Enhanced: Parallel classes handled via unified tasks")
         
-        # Get all unique class IDs across all lessons
-        all_class_ids = set()
-        for lesson in self.lessons:
-            all_class_ids.update(lesson.classIds)
-        
-        # For each class, for each day/period, ensure at most 1 lesson
-        for class_id in all_class_ids:
-            # Find all tasks that involve this class
-            relevant_tasks = [t for t in self.task_info if class_id in t['classIds']]
-            
-            if len(relevant_tasks) < 2:
+        # Classes with the same task set (parallel groups) need only one anchor constraint
+        anchors = {}  # frozenset(task_idx) -> anchor class_id
+        for class_id, tasks in self.class_to_tasks.items():
+            if len(tasks) < 2:
                 continue  # No conflicts possible
-            
-            for day in self.days:
-                for period in range(1, self.num_periods + 1):
-                    class_period_vars = []
-                    
-                    for task in relevant_tasks:
-                        lesson_idx = task['lesson_idx']
-                        task_idx = task['task_idx']
-                        task_type = task['type']
-                        
-                        if task_type == 'single':
-                            # Single at this period
-                            key = (lesson_idx, 'single', task_idx, day, period)
-                            if key in self.task_vars:
-                                class_period_vars.append(self.task_vars[key])
-                        else:  # double
-                            # Double at period P occupies P and P+1
-                            if period - 1 in self.valid_double_starts:
-                                key = (lesson_idx, 'double', task_idx, day, period - 1)
-                                if key in self.task_vars:
-                                    class_period_vars.append(self.task_vars[key])
-                            if period in self.valid_double_starts:
-                                key = (lesson_idx, 'double', task_idx, day, period)
-                                if key in self.task_vars:
-                                    class_period_vars.append(self.task_vars[key])
-                    
-                    if len(class_period_vars) > 1:
-                        # At most 1 lesson for this class at this time
-                        self.model.Add(sum(class_period_vars) <= 1)
-                        self.stats['constraintsAdded'] += 1
-    
-    def _add_double_period_constraints(self):
-        """Double periods must be consecutive and not span interval breaks"""
-        # Already enforced by only allowing valid_double_starts
-        # Double at period P automatically occupies P and P+1
-        pass
-    
-    def _set_objective(self, penalty_multiplier: float = 1.0):
-        """Maximize number of placed lessons with priority weights and subject distribution
-        
-        Args:
-            penalty_multiplier: Multiplier for distribution penalties (1.0 = -10000, 0.125 = -1250)
-        """
-        # HIERARCHICAL OPTIMIZATION: Lexicographical priority system
-        # Tier 1 (Placement): Singles = 1,000,000 pts | Doubles = 2,000,000 pts
-        # Tier 2 (Quality): Clumping penalty = -10,000 pts
-        # Logic: AI only accepts penalty if mathematically impossible to place without one
+            anchors.setdefault(frozenset(task['task_idx'] for task in tasks), class_id)
         
-        base_penalty = int(-10000 * penalty_multiplier)  # -10,000 for strict, -1,250 for relaxed
+        # One disjunctive resource per anchor; a task set inside a larger one is already covered.
+        # Largest first: a strict subset only needs testing against the maximal sets kept so far
+        kept = []
+        for task_set, class_id in sorted(anchors.items(), key=lambda item: -len(item[0])):
+            if any(task_set < other for other in kept):
+                continue
+            kept.append(task_set)
+            self.model.AddNoOverlap(self.class_intervals[class_id])
+            self.stats['constraintsAdded'] += 1
+    
+    def _set_objective(self):
+        """Maximize placed periods and add the HARD subject distribution constraints"""
+        # Placement: Singles = 1,000,000 pts | Doubles = 2,000,000 pts (per class)
         
-        objective_terms = []
+        objective_vars = []
+        objective_weights = []
         for task in self.task_info:
             task_idx = task['task_idx']
-            presence_var = self.presence_vars[task_idx]
             
-            # HIERARCHICAL WEIGHTS: Placement >> Quality (100:1 ratio)
             # Multiply by number of classes to fairly weight parallel lessons
-            weight = 2000000 if task['type'] == 'double' else 1000000
-            weight *= len(task['classIds'])  # Fair weighting for parallel classes
-            objective_terms.append(weight * presence_var)
+            # (= 1,000,000 per filled period: doubles 2,000,000 × class count)
+            weight = 1000000 * int(self._slot_weights[task_idx])
+            # Placement reward = weight * presence (= sum of the task's slot vars)
+            objective_vars.append(self.task_presence[task_idx])
+            objective_weights.append(weight)
         
         # ADVANCED PHASE 1: Hard distribution constraints (no subject twice per day)
         # This is a HARD CONSTRAINT - not a penalty
         print("\n🎯 Adding HARD subject distribution constraints (Phase 1)...")
         distribution_constraints = 0
         
-        # Get all unique class IDs
-        all_class_ids = set()
-        for lesson in self.lessons:
-            all_class_ids.update(lesson.classIds)
-        
-        # Group tasks by class and subject
-        class_subject_tasks = {}
-        for task in self.task_info:
-            lesson = task['lesson']
-            # Use first subject as representative (lessons can have multiple subjects)
-            subject_id = lesson.subjectIds[0] if lesson.subjectIds else None
-            
-            if subject_id:
-                # For each class in this task's classIds
-                for class_id in task['classIds']:
-                    key = (class_id, subject_id)
-                    if key not in class_subject_tasks:
-                        class_subject_tasks[key] = []
-                    class_subject_tasks[key].append(task)
-        
-        # For each class-subject combination, ENFORCE max 1 occurrence per day (HARD CONSTRAINT)
-        for (class_id, subject_id), tasks in class_subject_tasks.items():
-            if len(tasks) <= 1:
+        # For each class-subject combination (grouped while building variables),
+        # ENFORCE max 1 occurrence per day (HARD CONSTRAINT)
+        for (class_id, subject_id), task_idxs in self.class_subject_tasks.items():
+            if len(task_idxs) <= 1:
                 continue  # Only one task, no distribution issue
             
             # For each day, HARD LIMIT: sum of all tasks must be ≤ 1
-            for day in self.days:
-                day_vars = []
-                for task in tasks:
-                    task_idx = task['task_idx']
-                    lesson_idx = task['lesson_idx']
-                    task_type = task['type']
-                    
-                    # Collect variables for this task on this day
-                    if task_type == 'single':
-                        for period in range(1, self.num_periods + 1):
-                            key = (lesson_idx, 'single', task_idx, day, period)
-                            if key in self.task_vars:
-                                day_vars.append(self.task_vars[key])
-                    else:  # double
-                        for period in self.valid_double_starts:
-                            key = (lesson_idx, 'double', task_idx, day, period)
-                            if key in self.task_vars:
-                                day_vars.append(self.task_vars[key])
+            for day_idx in range(self.num_days):
+                day_vars = [var for task_idx in task_idxs for var in self.task_day_vars[task_idx][day_idx]]
                 
                 if len(day_vars) > 1:
                     # HARD CONSTRAINT: At most 1 task from this subject on this day for this class
-                    self.model.Add(sum(day_vars) <= 1)
+                    self.model.AddAtMostOne(day_vars)
                     distribution_constraints += 1
         
         print(f"   ✅ Added {distribution_constraints} HARD distribution constraints")
         print(f"   📈 Strategy: NO subject appears twice per day for any class (Phase 1)")
         
         # Maximize total weighted placements
-        self.model.Maximize(sum(objective_terms))
+        self.model.Maximize(cp_model.LinearExpr.WeightedSum(objective_vars, objective_weights))
         
         print(f"\n🎯 OBJECTIVE: Hierarchical placement")
         print(f"   Tier 1 Weights: Doubles=2,000,000pts, Singles=1,000,000pts (× class count for parallel)")
         print(f"   Distribution: HARD CONSTRAINT (enforced at constraint level, not objective)")
     
-    def solve(self, time_limit_seconds: int = 5400, allow_relaxation: bool = True, stage_callback=None) -> SolverResponse:
-        """Run the CP-SAT solver with advanced 3-phase optimization
+    def _greedy_assignment(self) -> Dict[int, tuple]:
+        """Fast greedy placement used to warm-start the first solve
+        
+        Places the largest tasks first (parallel classes x period length) in the
+        first slot where every teacher and class is free and the class has not
+        had that subject yet that day. Returns task_idx -> (day, period).
+        """
+        teacher_busy = np.zeros((len(self._teacher_idx), self.num_days, self.num_periods + 1), dtype=bool)
+        class_busy = np.zeros((len(self._class_idx), self.num_days, self.num_periods + 1), dtype=bool)
+        subject_days = set()  # (class_id, subject_id, day)
+        
+        assignment = {}
+        ordered_tasks = sorted(
+            self.task_info,
+            key=lambda t: -len(t['classIds']) * (2 if t['type'] == 'double' else 1)
+        )
+        for task in ordered_tasks:
+            lesson = task['lesson']
+            teacher_rows = [self._teacher_idx[t] for t in lesson.teacherIds]
+            class_rows = [self._class_idx[c] for c in task['classIds']]
+            subject_id = lesson.subjectIds[0] if lesson.subjectIds else None
+            
+            for day, period, _, is_double in self._task_to_vars[task['task_idx']]:
+                d = self._day_index[day]
+                periods = slice(period, period + 2) if is_double else slice(period, period + 1)
+                if teacher_busy[teacher_rows, d, periods].any() or class_busy[class_rows, d, periods].any():
+                    continue
+                if subject_id and any((c, subject_id, day) in subject_days for c in task['classIds']):
+                    continue
+                
+                teacher_busy[teacher_rows, d, periods] = True
+                class_busy[class_rows, d, periods] = True
+                if subject_id:
+                    subject_days.update((c, subject_id, day) for c in task['classIds'])
+                assignment[task['task_idx']] = (day, period)
+                break
+        
+        return assignment
+    
+    def _add_solution_hints(self, assignment: Dict[int, tuple]):
+        """Hint every slot variable from a task_idx -> (day, period) assignment"""
+        for task_idx, candidates in self._task_to_vars.items():
+            chosen = assignment.get(task_idx)
+            self.model.AddHint(self.task_presence[task_idx], chosen is not None)
+            for day, period, var, _ in candidates:
+                self.model.AddHint(var, (day, period) == chosen)
+        
+        print(f"   💡 Solution hint: {len(assignment)}/{len(self.task_info)} tasks pre-placed")
+    
+    def _configure_search(self):
+        """Search parameters for the current solver (Phase 1 and its continuation)"""
+        self.solver.parameters.num_search_workers = self._num_workers  # Default portfolio already diversifies search
+        self.solver.parameters.log_search_progress = self.DEBUG_SEARCH_LOG
+        # Objective terms are multiples of 1,000,000: a smaller gap already proves optimality
+        self.solver.parameters.absolute_gap_limit = 999999
+    
+    def _run_solver(self, deadline: float):
+        """Solve the current model until the incumbent stagnates
+        
+        Wall-clock guards run on a watcher thread: the caller's overall budget
+        (`deadline`) and the callback's time-based stall check.
+        """
+        finished = threading.Event()
+        # Stall windows scale with the budget left for this phase (defaults cap long runs)
+        budget = max(0.0, deadline - time.time())
+        callback = StagnationCallback(stall_seconds=min(120.0, budget / 6), min_seconds=min(300.0, budget / 3))
+        
+        def safeguard():
+            # Wake at least once a second until the deadline or a stall
+            while not finished.wait(min(1.0, max(0.0, deadline - time.time()))):
+                if time.time() >= deadline or callback.stalled():
+                    break
+            # Keep signalling: a stop requested before Solve() starts is reset by it
+            while not finished.is_set():
+                self.solver.StopSearch()
+                finished.wait(0.1)
+        
+        threading.Thread(target=safeguard, daemon=True).start()
+        try:
+            return self.solver.Solve(self.model, callback)
+        finally:
+            finished.set()
+    
+    def solve(self, time_limit_seconds: int = 5400, stage_callback=None) -> SolverResponse:
+        """Run the CP-SAT solver in up to two phases on one model
+        
+        MULTI-PHASE ENGINE (each phase runs until its incumbent stagnates):
+        - Phase 1: Strict perfection with HARD distribution constraints
+        - Phase 2: Continued search warm-started from Phase 1, only when Phase 1
+          stopped on a FEASIBLE (not proven optimal) timetable with budget left
         
-        MANDATORY 90-MINUTE MULTI-PHASE ENGINE:
-        - Phase 1 (60m): Strict perfection with HARD distribution constraints
-        - Phase 2 (20m): Heavy penalty fallback (-100,000 per violation) 
-        - Phase 3 (10m): Light penalty (-10) for guaranteed 100% placement
+        `time_limit_seconds` is an overall safeguard across all phases.
         """
         start_time = time.time()
+        deadline = start_time + time_limit_seconds
+        self._deadline = deadline  # Diagnostics probes share the same budget
         
         print("\n" + "="*80)
-        print("🚀 ADVANCED MULTI-PHASE SOLVER - 90 MINUTE ENGINE")
+        print(f"🚀 ADVANCED MULTI-PHASE SOLVER - {time_limit_seconds}s SAFEGUARD")
         print("="*80)
         
         # Step 1: Create variables
         self._create_variables()
+        if len(self.model.Proto().variables) < self.SMALL_MODEL_VAR_LIMIT:
+            self._num_workers = 1
         
         # Step 2: Add constraints (includes HARD distribution constraints)
         self._add_constraints()
@@ -496,11 +604,12 @@ class TimetableSolver:
         # Step 3: Set objective
         self._set_objective()
         
-        # ===== PHASE 1: STRICT PERFECTION (60 MINUTES) =====
-        phase1_time = 3600  # 60 minutes
+        # Step 4: Warm-start from a greedy placement
+        self._add_solution_hints(self._greedy_assignment())
         
-        print(f"\n🔍 PHASE 1: STRICT PERFECTION (60 minutes)")
-        print(f"   Time: {phase1_time}s (60 minutes)")
+        # ===== PHASE 1: STRICT PERFECTION =====
+        print(f"\n🔍 PHASE 1: STRICT PERFECTION")
+        print(f"   Termination: incumbent stagnation")
         print(f"   Strategy: HARD distribution constraints - NO subject twice per day")
         print(f"   Goal: Place all {len(self.task_info)} slots with 0 distribution violations")
         print(f"   Constraint Level: Teacher/Class conflicts + Distribution = HARD")
@@ -508,17 +617,11 @@ class TimetableSolver:
         
         # Update progress if callback provided
         if stage_callback:
-            stage_callback("PHASE 1: STRICT PERFECTION (60m) - Hard constraints enforced")
+            stage_callback("PHASE 1: STRICT PERFECTION - Hard constraints enforced")
         
-        self.solver.parameters.max_time_in_seconds = phase1_time
-        self.solver.parameters.num_search_workers = 4  # Optimized for memory management
-        self.solver.parameters.log_search_progress = True
-        self.solver.parameters.random_seed = 42
-        self.solver.parameters.relative_gap_limit = 0.0  # ELITE: Absolute best solution only
-        self.solver.parameters.search_branching = cp_model.PORTFOLIO_SEARCH  # Multi-strategy
-        self.solver.parameters.interleave_search = True  # Parallel path exploration
+        self._configure_search()
         
-        status = self.solver.Solve(self.model)
+        status = self._run_solver(deadline)
         
         solving_time = time.time() - start_time
         
@@ -527,11 +630,8 @@ class TimetableSolver:
             slots, unplaced_tasks = self._extract_solution()
             unplaced_count = len(unplaced_tasks)
             
-            # Calculate total required periods
-            total_required_slots = sum(
-                (1 if t['type'] == 'single' else 2) * len(t['classIds']) 
-                for t in self.task_info
-            )
+            # Total required periods (computed once per model build)
+            total_required_slots = self._total_required_slots
             placement_rate = len(slots) / total_required_slots if total_required_slots > 0 else 0
             
             print(f"\n✅ PHASE 1 COMPLETE: {len(slots)}/{total_required_slots} slots placed ({placement_rate*100:.1f}%)")
@@ -554,123 +654,46 @@ class TimetableSolver:
                     placedTasks=len(slots)
                 )
             
-            # ===== PHASE 2: HEAVY PENALTY FALLBACK (20 MINUTES) =====
-            print(f"\n🔍 PHASE 2: HEAVY PENALTY FALLBACK (20 minutes)")
-            print(f"   Unplaced from Phase 1: {unplaced_count} slots")
-            print(f"   Strategy: Remove HARD constraints, add -100,000pt penalties per violation")
-            print(f"   Goal: Maximize placement while heavily discouraging distribution violations")
-            print(f"   Time: 1200s (20 minutes)")
-            print("="*80)
-            
-            # Update progress if callback provided
-            if stage_callback:
-                stage_callback(f"PHASE 2: HEAVY PENALTY FALLBACK (20m) - {unplaced_count} slots remaining")
-            
-            # Rebuild model with soft constraints
-            gc.collect()
-            self.model = cp_model.CpModel()
-            self.solver = cp_model.CpSolver()
-            self.task_vars = {}
-            
-            self._create_variables()
-            self._add_constraints()  # Teacher/class conflicts still HARD
-            self._set_objective(penalty_multiplier=10.0)  # -100,000pt penalty mode
-            
-            self.solver.parameters.max_time_in_seconds = 1200  # 20 minutes
-            self.solver.parameters.num_search_workers = 4
-            self.solver.parameters.log_search_progress = True
-            
-            status = self.solver.Solve(self.model)
-            solving_time = time.time() - start_time
-            
-            if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-                slots, unplaced_tasks = self._extract_solution()
-                unplaced_count = len(unplaced_tasks)
-                placement_rate = len(slots) / total_required_slots if total_required_slots > 0 else 0
+            # OPTIMAL: no timetable places more periods, so searching again cannot help
+            if status == cp_model.FEASIBLE and time.time() < deadline:
+                # ===== PHASE 2: CONTINUED SEARCH =====
+                print(f"\n🔍 PHASE 2: CONTINUED SEARCH")
+                print(f"   Unplaced from Phase 1: {unplaced_count} slots")
+                print(f"   Strategy: Fresh search on the same model, warm-started from the Phase 1 timetable")
+                print(f"   Goal: Place more slots in the remaining {deadline - time.time():.0f}s")
+                print(f"   Termination: incumbent stagnation")
+                print("="*80)
                 
-                print(f"\n✅ PHASE 2 COMPLETE: {len(slots)}/{total_required_slots} slots placed ({placement_rate*100:.1f}%)")
-                print(f"   Unplaced: {unplaced_count} slots")
+                # Update progress if callback provided
+                if stage_callback:
+                    stage_callback(f"PHASE 2: CONTINUED SEARCH - {unplaced_count} slots remaining")
                 
-                # If fully placed, we're done!
-                if unplaced_count == 0:
-                    print(f"\n🎉 100% PLACEMENT ACHIEVED IN PHASE 2!")
-                    print(f"   Total solving time: {solving_time:.1f}s")
-                    return SolverResponse(
-                        success=True,
-                        status="success",
-                        message=f"Complete timetable with heavy penalties in {solving_time:.1f}s",
-                        slots=slots,
-                        unplacedTasks=[],
-                        solvingTime=solving_time,
-                        conflicts=0,
-                        stats=self.stats,
-                        totalTasks=len(self.task_info),
-                        placedTasks=len(slots)
-                    )
-            
-            # ===== PHASE 3: FINAL FORCE (10 MINUTES) =====
-            print(f"\n🔍 PHASE 3: FINAL FORCE (10 minutes)")
-            print(f"   Unplaced from Phase 2: {unplaced_count} slots")
-            print(f"   Strategy: Light penalty (-10pt) for guaranteed 100% placement")
-            print(f"   Goal: Force all slots in with minimal quality trade-off")
-            print(f"   Time: 600s (10 minutes)")
-            print("="*80)
-            
-            # Update progress if callback provided
-            if stage_callback:
-                stage_callback(f"PHASE 3: FINAL FORCE (10m) - Forcing {unplaced_count} remaining slots")
-            
-            # Rebuild model with very light penalties
-            gc.collect()
-            self.model = cp_model.CpModel()
-            self.solver = cp_model.CpSolver()
-            self.task_vars = {}
-            
-            self._create_variables()
-            self._add_constraints()  # Teacher/class conflicts still HARD
-            self._set_objective(penalty_multiplier=0.001)  # -10pt penalty mode
-            
-            self.solver.parameters.max_time_in_seconds = 600  # 10 minutes
-            self.solver.parameters.num_search_workers = 4
-            self.solver.parameters.log_search_progress = True
-            
-            status = self.solver.Solve(self.model)
-            solving_time = time.time() - start_time
-            
-            if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-                slots, unplaced_tasks = self._extract_solution()
-                unplaced_count = len(unplaced_tasks)
-                placement_rate = len(slots) / total_required_slots if total_required_slots > 0 else 0
+                # Same model and constraints: only the solver and hints are fresh
+                best_objective = self.solver.ObjectiveValue()
+                self.solver = cp_model.CpSolver()
+                self.model.ClearHints()
+                self._add_solution_hints(self._last_assignment)  # Warm-start from Phase 1
+                self._configure_search()
                 
-                print(f"\n✅ PHASE 3 COMPLETE: {len(slots)}/{total_required_slots} slots placed ({placement_rate*100:.1f}%)")
-                print(f"   Unplaced: {unplaced_count} slots")
-                print(f"   Total solving time: {solving_time:.1f}s ({solving_time/60:.1f} minutes)")
-                print("="*80)
+                status = self._run_solver(deadline)
+                solving_time = time.time() - start_time
                 
-                return SolverResponse(
-                    success=unplaced_count == 0,
-                    status="success" if unplaced_count == 0 else "partial",
-                    message=f"Timetable completed in 3-phase solving: {solving_time:.1f}s ({solving_time/60:.1f}m)",
-                    slots=slots,
-                    unplacedTasks=unplaced_tasks,
-                    solvingTime=solving_time,
-                    conflicts=0,
-                    stats=self.stats,
-                    totalTasks=len(self.task_info),
-                    placedTasks=len(slots)
-                )
+                if status in [cp_model.OPTIMAL, cp_model.FEASIBLE] and self.solver.ObjectiveValue() > best_objective:
+                    slots, unplaced_tasks = self._extract_solution()
+                    placement_rate = len(slots) / total_required_slots if total_required_slots > 0 else 0
+                    print(f"\n✅ PHASE 2 COMPLETE: {len(slots)}/{total_required_slots} slots placed ({placement_rate*100:.1f}%)")
+                    print(f"   Unplaced: {len(unplaced_tasks)} slots")
+                else:
+                    # Nothing better found: keep the Phase 1 timetable
+                    print(f"\n⚠️  PHASE 2 found no better timetable, keeping Phase 1 result")
+                    status = cp_model.FEASIBLE
+            
+            return self._build_response(status, solving_time, slots, unplaced_tasks)
         
-        # Handle UNKNOWN status (time limit with partial solution)
+        # Handle UNKNOWN status (time limit before any solution was found)
         if status == cp_model.UNKNOWN:
             print("\n⚠️  Time limit reached (UNKNOWN status)")
-            try:
-                slots, unplaced_tasks = self._extract_solution()
-                if len(slots) > 0:
-                    # Found partial solution
-                    return self._build_response(cp_model.FEASIBLE, solving_time, slots, unplaced_tasks)
-            except:
-                pass
-            # No solution at all
+            # CP-SAT reports FEASIBLE whenever it has a solution, so UNKNOWN has none to extract
             return self._build_response(cp_model.INFEASIBLE, solving_time, [], [])
         
         return self._build_response(status, solving_time)
@@ -686,44 +709,41 @@ class TimetableSolver:
         
         # Add diagnostics to unplaced tasks
         if len(unplaced_tasks) > 0:
-            unplaced_tasks = self._diagnose_unplaced_tasks(unplaced_tasks, slots)
+            unplaced_tasks = self._diagnose_unplaced_tasks(unplaced_tasks)
         
-        conflicts = 0  # CP-SAT guarantees no conflicts
         placed_count = len(slots)
         
-        # Calculate total required slots (single = 1 slot, double = 2 slots per class)
-        # Uses current task_info state (reset on each model rebuild)
-        total_required_slots = sum(
-            (1 if t['type'] == 'single' else 2) * len(t['classIds']) 
-            for t in self.task_info
-        )
+        # Total required slots (single = 1 slot, double = 2 slots per class)
+        # Computed once in _create_variables from task_info
+        total_required_slots = self._total_required_slots
         
-        coverage = (placed_count / total_required_slots * 100) if total_required_slots > 0 else 0
+        # Integer percentage for branch tests; the float is only formatted for messages
+        pct = placed_count * 100 // total_required_slots if total_required_slots > 0 else 0
         
-        if status == cp_model.OPTIMAL:
-            message = f"✅ Optimal solution! Placed {placed_count}/{total_required_slots} periods ({coverage:.1f}%)"
-            success = True
-        elif status == cp_model.FEASIBLE:
-            message = f"✅ Feasible solution. Placed {placed_count}/{total_required_slots} periods ({coverage:.1f}%)"
-            success = True
+        template = _SUCCESS_MSG_FMT.get(status)
+        if template is not None:
+            coverage = placed_count / total_required_slots * 100 if total_required_slots > 0 else 0
+            message = template.format(placed=placed_count, total=total_required_slots, pct=coverage)
+            # A timetable with unplaced periods is partial, as the multi-phase result always was
+            response_status = "partial" if unplaced_tasks else "success"
         else:
-            message = f"❌ No solution found (status: {self.solver.StatusName(status)})"
-            success = False
+            message = _FAILED_MSG_FMT.format(status=_STATUS_NAME.get(status, 'UNKNOWN'))
+            response_status = "failed"
         
         print(f"\n{message}")
         print(f"⏱️  Solving time: {solving_time:.2f}s")
         
-        if coverage < 100:
+        if pct < 100:
             print(f"⚠️  WARNING: {total_required_slots - placed_count} periods could not be placed")
         
         print("="*60)
         
         return SolverResponse(
-            success=success,
-            status="success" if success else "failed",
+            success=response_status == "success",
+            status=response_status,
             slots=slots,
             unplacedTasks=unplaced_tasks,
-            conflicts=conflicts,
+            conflicts=0,  # CP-SAT guarantees no conflicts
             solvingTime=solving_time,
             stats=self.stats,
             message=message,
@@ -731,58 +751,136 @@ class TimetableSolver:
             placedTasks=placed_count
         )
     
-    def _diagnose_unplaced_tasks(self, unplaced_tasks: List[UnplacedTask], scheduled_slots: List[TimetableSlot]) -> List[UnplacedTask]:
-        """Analyze why tasks couldn't be placed and add diagnostic information"""
-        print(f"\n🔍 Diagnosing {len(unplaced_tasks)} unplaced tasks...")
+    def _core_diagnostics(self, deadline: float) -> Dict[tuple, str]:
+        """Ask CP-SAT which placed tasks block each unplaced task
+        
+        Clones the model without objective, fixes every placed task to its slot
+        via assumptions and assumes the unplaced task is placed. An INFEASIBLE
+        probe yields an UNSAT core naming the blocking lessons.
+        Probing stops at `deadline`; unprobed tasks fall back to the heuristics.
+        Returns (lessonId, taskType) -> diagnostic message.
+        """
+        if not self._last_assignment or time.time() >= deadline:
+            return {}
+        
+        # One probe per (lesson, type): tasks of the same lesson and type are interchangeable
+        probe_tasks = {}
+        for task in self.task_info:
+            if task['task_idx'] not in self._last_assignment:
+                probe_tasks.setdefault((task['lesson'].lesson_id, task['type']), task)
+        if not probe_tasks:
+            return {}
+        probe_tasks = dict(list(probe_tasks.items())[:self.CORE_DIAGNOSTIC_LIMIT])
+        
+        probe_model = self.model.Clone()
+        probe_model.ClearObjective()
+        probe_model.ClearHints()
+        
+        # Assumption literals fixing the current placements
+        placed_literals = []
+        literal_task = {}  # proto index -> task_idx
+        for task_idx, chosen in self._last_assignment.items():
+            for day, period, var, _ in self._task_to_vars[task_idx]:
+                if (day, period) == chosen:
+                    literal = probe_model.GetBoolVarFromProtoIndex(var.Index())
+                    placed_literals.append(literal)
+                    literal_task[var.Index()] = task_idx
+                    break
         
-        # Build teacher and class utilization maps from scheduled slots
-        teacher_schedule = {}  # teacher_id -> {day -> [periods]}
-        class_schedule = {}    # class_id -> {day -> [periods]}
+        # Assuming a task's presence literal places it (ExactlyOne channels it to its slots)
+        wanted_literals = {
+            key: probe_model.GetBoolVarFromProtoIndex(self.task_presence[task['task_idx']].Index())
+            for key, task in probe_tasks.items()
+        }
         
-        for slot in scheduled_slots:
-            # Get lesson info to find teachers
-            lesson = next((l for l in self.lessons if l.lesson_id == slot.lessonId), None)
-            if not lesson:
-                continue
-            
-            # Track class schedule
-            if slot.classId not in class_schedule:
-                class_schedule[slot.classId] = {}
-            if slot.day not in class_schedule[slot.classId]:
-                class_schedule[slot.classId][slot.day] = []
-            class_schedule[slot.classId][slot.day].append(slot.periodNumber)
+        probe_solver = cp_model.CpSolver()
+        probe_solver.parameters.num_search_workers = 1  # Core extraction is single-worker
+        probe_solver.parameters.max_deterministic_time = 1.0
+        # Presolve would re-run on every probe of the full model; the assumptions alone
+        # make each probe a short propagation, and cores come out no larger without it
+        probe_solver.parameters.cp_model_presolve = False
+        
+        diagnostics = {}
+        for key, wanted in wanted_literals.items():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break  # Budget spent: the rest get heuristic diagnostics
+            probe_solver.parameters.max_time_in_seconds = remaining
+            probe_model.ClearAssumptions()
+            probe_model.AddAssumptions([wanted] + placed_literals)
+            status = probe_solver.Solve(probe_model)
             
-            # Track teacher schedule for all teachers in this lesson
-            for teacher_id in lesson.teacherIds:
-                if teacher_id not in teacher_schedule:
-                    teacher_schedule[teacher_id] = {}
-                if slot.day not in teacher_schedule[teacher_id]:
-                    teacher_schedule[teacher_id][slot.day] = []
-                teacher_schedule[teacher_id][slot.day].append(slot.periodNumber)
+            if status == cp_model.INFEASIBLE:
+                core_lessons = {
+                    lesson.lesson_id: lesson.lesson_name
+                    for lesson in (
+                        self.task_info[literal_task[i]]['lesson']
+                        for i in probe_solver.SufficientAssumptionsForInfeasibility()
+                        if i in literal_task
+                    )
+                }
+                # The lesson's own placed periods block it via the one-per-day subject limit
+                blocking = {name for lesson_id, name in core_lessons.items() if lesson_id != key[0]}
+                if blocking:
+                    names = sorted(blocking)
+                    more = f" and {len(names) - 3} more" if len(names) > 3 else ""
+                    diagnostics[key] = f"Placement blocked: every valid slot conflicts with {', '.join(names[:3])}{more} (solver-verified)"
+                elif core_lessons:
+                    diagnostics[key] = "Placement blocked: this lesson's other periods already take every day it could use (max one per subject per day, solver-verified)"
+                else:
+                    diagnostics[key] = "Placement blocked: no slot satisfies the hard constraints even in an empty timetable (solver-verified)"
+            elif status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                diagnostics[key] = "Placeable in the current timetable, but the search stopped before placing it (try a longer time limit)"
+        
+        print(f"   🧩 Solver-verified diagnostics for {len(diagnostics)}/{len(probe_tasks)} lesson task groups")
+        return diagnostics
+    
+    def _diagnose_unplaced_tasks(self, unplaced_tasks: List[UnplacedTask]) -> List[UnplacedTask]:
+        """Analyze why tasks couldn't be placed and add diagnostic information"""
+        print(f"\n🔍 Diagnosing {len(unplaced_tasks)} unplaced tasks...")
         
         # Calculate total available slots per entity
         total_slots = len(self.days) * self.num_periods
         
+        # Busy matrices are maintained by _update_busy on every extraction
+        # Utilization for every teacher/class at once
+        if total_slots > 0:
+            teacher_utilizations = self._teacher_busy.mean(axis=1)
+            class_utilizations = self._class_busy.mean(axis=1)
+        else:
+            teacher_utilizations = np.zeros(len(self._teacher_idx))
+            class_utilizations = np.zeros(len(self._class_idx))
+        idle = np.zeros(total_slots, dtype=np.uint8)
+        # Adjacent (p, p + 1) pairs a double may start at: pairs across interval breaks don't count
+        double_start_mask = np.zeros(max(self.num_periods - 1, 0), dtype=bool)
+        double_start_mask[[p - 1 for p in self.valid_double_starts]] = True
+        
+        # Solver-verified reasons where available; heuristics below are the fallback
+        core_diagnostics = self._core_diagnostics(self._deadline)
+        
         # Diagnose each unplaced task
         diagnosed_tasks = []
         for task in unplaced_tasks:
             # Find the lesson for this task
-            lesson = next((l for l in self.lessons if l.lesson_id == task.lessonId), None)
+            lesson = self._lesson_by_id.get(task.lessonId)
             if not lesson:
                 task.diagnostic = "Lesson not found in system"
                 diagnosed_tasks.append(task)
                 continue
             
-            # Calculate teacher utilization
-            teacher_utilization = 0
-            if lesson.teacherIds:
-                teacher_id = lesson.teacherIds[0]  # Use first teacher
-                teacher_busy_count = sum(len(periods) for periods in teacher_schedule.get(teacher_id, {}).values())
-                teacher_utilization = teacher_busy_count / total_slots if total_slots > 0 else 0
+            core_diagnostic = core_diagnostics.get((task.lessonId, task.taskType))
+            if core_diagnostic:
+                task.diagnostic = core_diagnostic
+                diagnosed_tasks.append(task)
+                continue
             
-            # Calculate class utilization
-            class_busy_count = sum(len(periods) for periods in class_schedule.get(task.classId, {}).values())
-            class_utilization = class_busy_count / total_slots if total_slots > 0 else 0
+            # Busy rows and utilization (first teacher is representative)
+            teacher_row = self._teacher_idx[lesson.teacherIds[0]] if lesson.teacherIds else None
+            class_row = self._class_idx.get(task.classId)
+            teacher_busy = self._teacher_busy[teacher_row] if teacher_row is not None else idle
+            class_busy = self._class_busy[class_row] if class_row is not None else idle
+            teacher_utilization = teacher_utilizations[teacher_row] if teacher_row is not None else 0
+            class_utilization = class_utilizations[class_row] if class_row is not None else 0
             
             # Get teacher and class names for detailed diagnostics
             teacher_name = "Unknown Teacher"
@@ -802,31 +900,18 @@ class TimetableSolver:
             elif class_utilization > 0.90:
                 task.diagnostic = f"Placement blocked: {class_name} schedule nearly full ({class_utilization*100:.0f}% utilization)"
             elif teacher_utilization > 0.70 and class_utilization > 0.70:
-                # ELITE: Check for exact schedule mismatch
-                teacher_free_slots = set()
-                class_free_slots = set()
-                
-                for day in self.days:
-                    teacher_busy = set(teacher_schedule.get(lesson.teacherIds[0] if lesson.teacherIds else '', {}).get(day, []))
-                    class_busy = set(class_schedule.get(task.classId, {}).get(day, []))
-                    
-                    for period in range(1, self.num_periods + 1):
-                        if period not in teacher_busy:
-                            teacher_free_slots.add((day, period))
-                        if period not in class_busy:
-                            class_free_slots.add((day, period))
-                
-                # Check if there's overlap in free slots
-                overlap = teacher_free_slots & class_free_slots
-                required_slots = 2 if task.taskType == 'double' else 1
+                # ELITE: Check for exact schedule mismatch (slots free for both)
+                free = ((teacher_busy == 0) & (class_busy == 0)).reshape(len(self.days), self.num_periods)
+                overlap_count = int(free.sum())
                 
-                if len(overlap) == 0:
+                if overlap_count == 0:
                     task.diagnostic = f"Placement blocked: {teacher_name} is 100% busy during all periods where {class_name} has free slots"
-                elif len(overlap) < required_slots:
-                    task.diagnostic = f"Placement blocked: Only {len(overlap)} overlapping free slot(s), but {required_slots} consecutive needed for {task.taskType}"
+                # Doubles need two adjacent free periods on the same day (only checked for doubles)
+                elif task.taskType == 'double' and not (free[:, :-1] & free[:, 1:] & double_start_mask).any():
+                    task.diagnostic = f"Placement blocked: {overlap_count} overlapping free slot(s), but 2 consecutive needed for double"
                 else:
                     # Has overlap but still can't place - must be interval or other constraint
-                    task.diagnostic = f"Placement blocked: Interval breaks or subject distribution constraints prevent scheduling despite {len(overlap)} free overlapping slots"
+                    task.diagnostic = f"Placement blocked: Interval breaks or subject distribution constraints prevent scheduling despite {overlap_count} free overlapping slots"
             elif teacher_utilization < 0.30:
                 task.diagnostic = f"Placement blocked: Insufficient overall demand or over-constrained problem (teacher only {teacher_utilization*100:.0f}% utilized)"
             else:
@@ -837,31 +922,74 @@ class TimetableSolver:
         print(f"   ✅ Diagnostics completed for {len(diagnosed_tasks)} tasks")
         return diagnosed_tasks
     
+    def _update_busy(self, assignment: Dict[int, tuple]):
+        """Apply only the placements that changed since the last extraction to the busy matrices"""
+        previous = self._last_assignment
+        removed = [(task_idx, slot) for task_idx, slot in previous.items() if assignment.get(task_idx) != slot]
+        added = [(task_idx, slot) for task_idx, slot in assignment.items() if previous.get(task_idx) != slot]
+        
+        # Clear before setting: a moved task may land on cells another task just vacated
+        for value, changes in ((0, removed), (1, added)):
+            for task_idx, (day, period) in changes:
+                task = self.task_info[task_idx]
+                start = self._day_index[day] * self.num_periods + period - 1
+                cells = slice(start, start + (2 if task['type'] == 'double' else 1))
+                self._teacher_busy[[self._teacher_idx[t] for t in task['lesson'].teacherIds], cells] = value
+                self._class_busy[[self._class_idx[c] for c in task['classIds']], cells] = value
+    
+    @staticmethod
+    def _emit_double(class_id: str, lesson_id: str, day: str, period: int) -> tuple[TimetableSlot, TimetableSlot]:
+        """Both halves of a double period (start at `period`, end at `period + 1`)"""
+        return (
+            TimetableSlot.model_construct(
+                classId=class_id,
+                lessonId=lesson_id,
+                day=day,
+                periodNumber=period,
+                isDoubleStart=True,
+                isDoubleEnd=False
+            ),
+            TimetableSlot.model_construct(
+                classId=class_id,
+                lessonId=lesson_id,
+                day=day,
+                periodNumber=period + 1,
+                isDoubleStart=False,
+                isDoubleEnd=True
+            ),
+        )
+    
     def _extract_solution(self) -> tuple[List[TimetableSlot], List[UnplacedTask]]:
         """Extract assigned slots and unplaced tasks from the solved model"""
-        slots = []
+        # Preallocate for the full timetable; trimmed to the placed count at the end
+        slots = [None] * self._total_required_slots
+        slot_count = 0
         unplaced_tasks = []
+        assignment = {}  # task_idx -> (day, period), reused as Phase 2 hints
+        
+        # Read the whole solution vector once and pick out the true slot vars in bulk
+        solution = np.array(self.solver.ResponseProto().solution, dtype=np.int64)
+        chosen = np.flatnonzero(solution[self._candidate_index])  # positions in _candidate_index
+        chosen_task = np.searchsorted(self._candidate_offsets, chosen, side='right') - 1
+        chosen_slot = dict(zip(chosen_task.tolist(), (chosen - self._candidate_offsets[chosen_task]).tolist()))
         
         for task in self.task_info:
             task_idx = task['task_idx']
+            lesson = task['lesson']
+            task_type = task['type']
             
-            # Check if task was placed
-            task_placed = True
-            if task_idx in self.presence_vars:
-                if not self.solver.Value(self.presence_vars[task_idx]):
-                    task_placed = False
+            # Which candidate slot this task was assigned to (none = not placed)
+            assigned_day = None
+            assigned_period = None
+            position = chosen_slot.get(task_idx)
+            if position is not None:
+                assigned_day, assigned_period, _, _ = self._task_to_vars[task_idx][position]
             
-            if not task_placed:
+            if not (assigned_day and assigned_period):
                 # Task not placed - add to unplaced list FOR EACH CLASS
-                lesson = task['lesson']
-                task_type = task['type']
-                
-                for class_id in task['classIds']:
-                    # Find class name
-                    class_obj = next((c for c in self.request.classes if c.class_id == class_id), None)
-                    class_name = f"{class_obj.grade}-{class_obj.name}" if class_obj else "Unknown"
-                    
-                    unplaced_tasks.append(UnplacedTask(
+                for class_id, class_name in zip(task['classIds'], task['class_names']):
+                    # Fields come from already-validated request data: skip re-validation
+                    unplaced_tasks.append(UnplacedTask.model_construct(
                         lessonId=lesson.lesson_id,
                         classId=class_id,
                         lessonName=lesson.lesson_name,
@@ -871,63 +999,31 @@ class TimetableSolver:
                     ))
                 continue  # Skip to next task
             
-            lesson_idx = task['lesson_idx']
-            lesson = task['lesson']
-            task_type = task['type']
-            
-            # Find which slot this task was assigned to
-            assigned_day = None
-            assigned_period = None
+            assignment[task_idx] = (assigned_day, assigned_period)
             
-            for day in self.days:
+            # ✨ CRITICAL: Create slots for ALL classes in this task's classIds
+            # Solver output is trusted: model_construct skips Pydantic validation
+            for class_id in task['classIds']:
                 if task_type == 'single':
-                    for period in range(1, self.num_periods + 1):
-                        key = (lesson_idx, 'single', task_idx, day, period)
-                        if key in self.task_vars and self.solver.Value(self.task_vars[key]):
-                            assigned_day = day
-                            assigned_period = period
-                            break
+                    slots[slot_count] = TimetableSlot.model_construct(
+                        classId=class_id,
+                        lessonId=lesson.lesson_id,
+                        day=assigned_day,
+                        periodNumber=assigned_period,
+                        isDoubleStart=False,
+                        isDoubleEnd=False
+                    )
+                    slot_count += 1
                 else:  # double
-                    for period in self.valid_double_starts:
-                        key = (lesson_idx, 'double', task_idx, day, period)
-                        if key in self.task_vars and self.solver.Value(self.task_vars[key]):
-                            assigned_day = day
-                            assigned_period = period
-                            break
-                if assigned_day:
-                    break
-            
-            # ✨ CRITICAL: Create slots for ALL classes in this task's classIds
-            if assigned_day and assigned_period:
-                for class_id in task['classIds']:
-                    if task_type == 'single':
-                        slots.append(TimetableSlot(
-                            classId=class_id,
-                            lessonId=lesson.lesson_id,
-                            day=assigned_day,
-                            periodNumber=assigned_period,
-                            isDoubleStart=False,
-                            isDoubleEnd=False
-                        ))
-                    else:  # double
-                        # Add two slots for double period
-                        slots.append(TimetableSlot(
-                            classId=class_id,
-                            lessonId=lesson.lesson_id,
-                            day=assigned_day,
-                            periodNumber=assigned_period,
-                            isDoubleStart=True,
-                            isDoubleEnd=False
-                        ))
-                        slots.append(TimetableSlot(
-                            classId=class_id,
-                            lessonId=lesson.lesson_id,
-                            day=assigned_day,
-                            periodNumber=assigned_period + 1,
-                            isDoubleStart=False,
-                            isDoubleEnd=True
-                        ))
+                    # Add two slots for double period
+                    slots[slot_count], slots[slot_count + 1] = self._emit_double(
+                        class_id, lesson.lesson_id, assigned_day, assigned_period
+                    )
+                    slot_count += 2
         
+        del slots[slot_count:]
+        self._update_busy(assignment)
+        self._last_assignment = assignment
         return slots, unplaced_tasks
 
 # ==================== API ENDPOINTS ====================
@@ -948,8 +1044,9 @@ async def health():
 @app.post("/clear-jobs")
 async def clear_jobs():
     """Clear all active jobs (useful after solver restart or model updates)"""
-    cleared_count = len(active_jobs)
-    active_jobs.clear()
+    with jobs_lock:
+        cleared_count = len(active_jobs)
+        active_jobs.clear()
     return {
         "status": "success",
         "message": f"Cleared {cleared_count} job(s)",
@@ -958,57 +1055,123 @@ async def clear_jobs():
 
 # ==================== ASYNC JOB SYSTEM (NO TIMEOUT RISK!) ====================
 
+def _update_job(job_id: str, **fields):
+    with jobs_lock:
+        job = active_jobs[job_id]
+        job.update(fields)
+        job['version'] += 1  # Lets /job-events detect changes without diffing the job
+
+def _prune_finished_jobs():
+    """Drop completed/failed jobs older than JOB_RETENTION_SECONDS"""
+    now = datetime.now()
+    with jobs_lock:
+        expired = [
+            job_id for job_id, job in active_jobs.items()
+            if job.get('completedAt')
+            and (now - datetime.fromisoformat(job['completedAt'])).total_seconds() > JOB_RETENTION_SECONDS
+        ]
+        for job_id in expired:
+            del active_jobs[job_id]
+
+def _solve_worker(request: SolverRequest, events):
+    """Child-process entry point: run one solve, reporting progress and the result over `events`"""
+    try:
+        solver = TimetableSolver(request, freeze_gc=True)  # This child runs only this solve
+        result = solver.solve(
+            time_limit_seconds=request.maxTimeLimit,
+            stage_callback=lambda message: events.put(('progress', message))
+        )
+        events.put(('result', result.model_dump(mode='json')))  # Dumped once, in the child
+    except Exception as e:
+        events.put(('error', str(e)))
+
+def _run_solve_process(request: SolverRequest, on_progress=None) -> Dict:
+    """Run one solve in a child process and return its dumped SolverResponse
+    
+    Keeps CP-SAT and solution extraction off the API process ("spawn" avoids
+    forking with OR-Tools threads live). The child is terminated if it overruns
+    maxTimeLimit + SOLVE_GRACE_SECONDS.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    events = ctx.Queue()
+    process = ctx.Process(target=_solve_worker, args=(request, events), daemon=True)
+    process.start()
+    hard_deadline = time.time() + request.maxTimeLimit + SOLVE_GRACE_SECONDS
+    try:
+        while True:
+            try:
+                kind, payload = events.get(timeout=max(0.0, min(1.0, hard_deadline - time.time())))
+            except queue.Empty:
+                if time.time() >= hard_deadline:
+                    raise TimeoutError(f"Solver exceeded its {request.maxTimeLimit}s time limit and was stopped")
+                if not process.is_alive():
+                    raise RuntimeError(f"Solver process exited unexpectedly (exit code {process.exitcode})")
+                continue
+            
+            if kind == 'progress':
+                if on_progress:
+                    on_progress(payload)
+            elif kind == 'result':
+                return payload
+            else:
+                raise RuntimeError(payload)
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+
 def run_solver_background(job_id: str, request: SolverRequest):
     """Background worker function to run solver asynchronously"""
     try:
-        active_jobs[job_id]['status'] = 'processing'
-        active_jobs[job_id]['progress'] = 'Initializing AI solver...'
+        _update_job(job_id, status='processing', progress='Initializing AI solver...')
         
         # Define progress callback to update active_jobs
         def update_progress(message: str):
-            active_jobs[job_id]['progress'] = message
+            _update_job(job_id, progress=message)
             print(f"📊 Progress Update: {message}")
         
-        solver = TimetableSolver(request)
-        result = solver.solve(
-            time_limit_seconds=request.maxTimeLimit,
-            allow_relaxation=request.allowRelaxation,
-            stage_callback=update_progress
-        )
+        result = _run_solve_process(request, on_progress=update_progress)
         
-        active_jobs[job_id]['status'] = 'completed'
-        active_jobs[job_id]['result'] = result.model_dump()
-        active_jobs[job_id]['progress'] = 'Completed successfully!'
-        active_jobs[job_id]['completedAt'] = datetime.now().isoformat()
+        _update_job(
+            job_id,
+            status='completed',
+            result=result,  # Dumped once in the solve process; every poll reuses this dict
+            progress='Completed successfully!',
+            completedAt=datetime.now().isoformat()
+        )
         
     except Exception as e:
-        active_jobs[job_id]['status'] = 'failed'
-        active_jobs[job_id]['error'] = str(e)
-        active_jobs[job_id]['progress'] = f'Error: {str(e)}'
-        active_jobs[job_id]['completedAt'] = datetime.now().isoformat()
+        _update_job(
+            job_id,
+            status='failed',
+            error=str(e),
+            progress=f'Error: {str(e)}',
+            completedAt=datetime.now().isoformat()
+        )
 
 @app.post("/start-solve")
 async def start_solve(request: SolverRequest):
     """
     🚀 Start asynchronous timetable generation (NO TIMEOUT RISK!)
     
-    Returns job_id immediately, solver runs in background thread
-    Client polls /job-status/{job_id} every 5 seconds
+    Returns job_id immediately, solver runs on the background job pool
+    Client polls /job-status/{job_id} every 5 seconds, or subscribes to /job-events/{job_id}
     """
     job_id = str(uuid.uuid4())
+    _prune_finished_jobs()
     
-    active_jobs[job_id] = {
-        'status': 'starting',
-        'progress': 'Job queued...',
-        'createdAt': datetime.now().isoformat(),
-        'result': None,
-        'error': None
-    }
+    with jobs_lock:
+        active_jobs[job_id] = {
+            'status': 'starting',
+            'progress': 'Job queued...',
+            'createdAt': datetime.now().isoformat(),
+            'result': None,
+            'error': None,
+            'version': 0
+        }
     
-    # Start solver in background thread
-    thread = threading.Thread(target=run_solver_background, args=(job_id, request))
-    thread.daemon = True
-    thread.start()
+    # Queue the solver on the bounded job pool
+    JOB_EXECUTOR.submit(run_solver_background, job_id, request)
     
     return {
         "jobId": job_id,
@@ -1027,11 +1190,60 @@ async def get_job_status(job_id: str):
     - result: Full solver result (when status='completed')
     - error: Error message (when status='failed')
     """
-    if job_id not in active_jobs:
+    job = _job_snapshot(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = active_jobs[job_id]
+    # Result is already JSON-safe: bypass FastAPI's jsonable_encoder walk over every slot
+    return JSONResponse(_job_status_payload(job_id, job))
+
+@app.get("/job-events/{job_id}")
+async def job_events(job_id: str):
+    """
+    📡 Stream job progress as Server-Sent Events (alternative to polling /job-status)
+    
+    Events:
+    - progress: {"status", "progress"} whenever either changes
+    - result: the full /job-status payload, sent once when the job completes or fails
+    """
+    if _job_snapshot(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        seen_version = -1
+        idle_seconds = 0.0
+        while True:
+            job = _job_snapshot(job_id)
+            if job is None:
+                # Job was cleared or pruned while streaming
+                yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+                return
+            if job['status'] in ('completed', 'failed'):
+                yield f"event: result\ndata: {json.dumps(_job_status_payload(job_id, job))}\n\n"
+                return
+            if job['version'] != seen_version:
+                seen_version = job['version']
+                idle_seconds = 0.0
+                yield f"event: progress\ndata: {json.dumps({'status': job['status'], 'progress': job['progress']})}\n\n"
+            elif idle_seconds >= JOB_EVENTS_KEEPALIVE_SECONDS:
+                idle_seconds = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+            idle_seconds += JOB_EVENTS_POLL_SECONDS
     
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _job_snapshot(job_id: str) -> Optional[Dict]:
+    """Copy of a job's fields taken under the lock (the worker keeps updating the original)"""
+    with jobs_lock:
+        job = active_jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+def _job_status_payload(job_id: str, job: Dict) -> Dict:
     # Add backward compatibility: ensure result has 'success' field
     result = job.get('result')
     if result and isinstance(result, dict) and 'success' not in result:
@@ -1058,17 +1270,14 @@ async def solve_timetable(request: SolverRequest):
     - **lessons**: List of lessons with teacher/class assignments
     - **classes**: List of classes
     - **config**: School configuration (periods, days, intervals)
-    - **allowRelaxation**: Enable two-stage solving (strict → relaxed if needed)
+    - **allowRelaxation**: Accepted for compatibility (distribution is always a hard constraint)
     
     Returns optimized timetable with 0 conflicts and intelligent diagnostics
     """
     try:
-        solver = TimetableSolver(request)
-        result = solver.solve(
-            time_limit_seconds=request.maxTimeLimit,
-            allow_relaxation=request.allowRelaxation
-        )
-        return result
+        # Solve in a child process (on the shared job pool) so the event loop keeps serving other requests
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(JOB_EXECUTOR, _run_solve_process, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Solver error: {str(e)}")
 